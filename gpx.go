@@ -16,6 +16,13 @@ import (
 
 type Point struct {
 	Lat, Lon, Ele, Speed, Slope, Distance, SmoothedSlope, AvgSpeed, MapScale, ResidualMapScale, Bearing float64
+	// Tile coordinates at args.MapZoom, precomputed once, stored as
+	// float32 offsets from Track.WorldOriginX/Y. Absolute tile coords
+	// (tens of thousands at zoom 15) would lose pixel precision in
+	// float32, but a whole track only spans a few dozen tiles, so the
+	// origin-relative offsets stay accurate to well under a pixel at
+	// half the memory per coordinate.
+	WorldX, WorldY float32
 	Timestamp      time.Time
 	TileZoom       int
 }
@@ -26,6 +33,10 @@ type Track struct {
 	TotalDistance  float64
 	RenderFromIndex int
 	RenderToIndex   int
+	// Tile coordinates of the first point at args.MapZoom; Point.WorldX/Y
+	// are offsets from here.
+	WorldOriginX float64
+	WorldOriginY float64
 }
 
 type TrackAdjustmentSpec struct {
@@ -81,9 +92,9 @@ func parseGpx(filePath string) ([]Point, error) {
 	}
 	var firstEle float64
 	firstEleIdx := -1
-	for i, p := range points {
-		if p.Ele != 0 {
-			firstEle = p.Ele
+	for i := range points {
+		if points[i].Ele != 0 {
+			firstEle = points[i].Ele
 			firstEleIdx = i
 			break
 		}
@@ -217,8 +228,8 @@ func applyTrackAdjustments(points []Point, specs []TrackAdjustmentSpec) ([]float
 			}
 			lastDistance = dist
 
-			for i, p := range points {
-				if p.Distance >= dist {
+			for i := range points {
+				if points[i].Distance >= dist {
 					pointIndex = i
 					break
 				}
@@ -240,8 +251,8 @@ func applyTrackAdjustments(points []Point, specs []TrackAdjustmentSpec) ([]float
 				targetTime = startTime.Add(time.Duration(timeOffset * float64(time.Second)))
 			}
 
-			for i, p := range points {
-				if !p.Timestamp.Before(targetTime) {
+			for i := range points {
+				if !points[i].Timestamp.Before(targetTime) {
 					pointIndex = i
 					break
 				}
@@ -311,10 +322,23 @@ func applyTrackAdjustments(points []Point, specs []TrackAdjustmentSpec) ([]float
 	return scaleMultipliers, nil
 }
 
-func preprocessGpxPoints(points []Point, args *Arguments) []Point {
+func preprocessGpxPoints(track *Track, args *Arguments) []Point {
+	points := track.Points
 	if len(points) < 2 {
 		return points
 	}
+
+	// Precompute tile coordinates at the base zoom once. Other zoom levels
+	// differ only by a power-of-two factor, so the render loop can rescale
+	// these instead of redoing the mercator trig for every path point on
+	// every frame. Mutates the raw points too: the path drawing uses them.
+	track.WorldOriginX, track.WorldOriginY = deg2num(points[0].Lat, points[0].Lon, args.MapZoom)
+	for i := range points {
+		x, y := deg2num(points[i].Lat, points[i].Lon, args.MapZoom)
+		points[i].WorldX = float32(x - track.WorldOriginX)
+		points[i].WorldY = float32(y - track.WorldOriginY)
+	}
+
 	smoothed := make([]Point, len(points))
 	copy(smoothed, points)
 
@@ -324,8 +348,16 @@ func preprocessGpxPoints(points []Point, args *Arguments) []Point {
 		}
 	}
 
+	// Haversine between consecutive points, computed once and reused by the
+	// distance and speed passes below (the speed window used to recompute
+	// each delta up to 5 times).
+	deltas := make([]float64, len(smoothed))
+	for i := 1; i < len(smoothed); i++ {
+		deltas[i] = haversine(smoothed[i-1], smoothed[i])
+	}
+
 	for i := 1; i < len(smoothed); i++ {
-		smoothed[i].Distance = smoothed[i-1].Distance + haversine(smoothed[i-1], smoothed[i])
+		smoothed[i].Distance = smoothed[i-1].Distance + deltas[i]
 
 		// Speed calculation (centered 5 points)
 		windowStart := i - 2
@@ -340,7 +372,7 @@ func preprocessGpxPoints(points []Point, args *Arguments) []Point {
 		var totalDist float64
 		var totalTime float64
 		for j := windowStart; j < windowEnd; j++ {
-			totalDist += haversine(smoothed[j], smoothed[j+1])
+			totalDist += deltas[j+1]
 			totalTime += smoothed[j+1].Timestamp.Sub(smoothed[j].Timestamp).Seconds()
 		}
 		if totalTime > 0 {
@@ -530,20 +562,20 @@ func preprocessGpxPoints(points []Point, args *Arguments) []Point {
 	return smoothed
 }
 
+const degToRad = math.Pi / 180
+
 func haversine(p1, p2 Point) float64 {
 	const R = 6371 // Earth radius in kilometers
-	lat1 := p1.Lat * math.Pi / 180
-	lon1 := p1.Lon * math.Pi / 180
-	lat2 := p2.Lat * math.Pi / 180
-	lon2 := p2.Lon * math.Pi / 180
-
-	dLat := lat2 - lat1
-	dLon := lon2 - lon1
+	lat1 := p1.Lat * degToRad
+	lat2 := p2.Lat * degToRad
 
-	a := math.Sin(dLat/2)*math.Sin(dLat/2) + math.Cos(lat1)*math.Cos(lat2)*math.Sin(dLon/2)*math.Sin(dLon/2)
-	c := 2 * math.Atan2(math.Sqrt(a), math.Sqrt(1-a))
+	sinDLat := math.Sin((lat2 - lat1) / 2)
+	sinDLon := math.Sin((p2.Lon - p1.Lon) * degToRad / 2)
 
-	return R * c
+	a := sinDLat*sinDLat + math.Cos(lat1)*math.Cos(lat2)*sinDLon*sinDLon
+	// asin(sqrt(a)) == atan2(sqrt(a), sqrt(1-a)) for a in [0,1],
+	// with one transcendental and one sqrt fewer
+	return 2 * R * math.Asin(math.Sqrt(a))
 }
 
 func bearing(p1, p2 Point) float64 {
@@ -578,8 +610,8 @@ func parseCutBoundary(boundary string, points []Point) int {
 			return 0
 		}
 		startTime := points[0].Timestamp
-		for i, p := range points {
-			if p.Timestamp.Sub(startTime).Seconds() >= seconds {
+		for i := range points {
+			if points[i].Timestamp.Sub(startTime).Seconds() >= seconds {
 				return i
 			}
 		}
@@ -589,8 +621,8 @@ func parseCutBoundary(boundary string, points []Point) int {
 		if err != nil {
 			return 0
 		}
-		for i, p := range points {
-			if p.Distance >= km {
+		for i := range points {
+			if points[i].Distance >= km {
 				return i
 			}
 		}
@@ -13,6 +13,7 @@ import (
 
 const (
 	tileCacheDir           = "tiles"
+	tileCacheMaxEntries    = 512
 	tileFetchConcurrency   = 8
 	slopeMaxEleChange      = 3.0
 	avgSpeedWindow         = 15 * time.Second
@@ -34,12 +35,12 @@ func main() {
 	}
 
 	track := &Track{Points: points}
-	track.SmoothedPoints = preprocessGpxPoints(track.Points, args)
+	track.SmoothedPoints = preprocessGpxPoints(track, args)
 	track.RenderToIndex = len(track.SmoothedPoints)
 
-	for i := 1; i < len(track.Points); i++ {
-		track.TotalDistance += haversine(track.Points[i-1], track.Points[i])
-	}
+	// preprocessGpxPoints already accumulated cumulative distance over the
+	// same coordinates, so the total is just the last point's Distance.
+	track.TotalDistance = track.SmoothedPoints[len(track.SmoothedPoints)-1].Distance
 
 	cutTrack(track, args.From, args.To)
 
@@ -80,7 +81,7 @@ func main() {
 
 	if args.RenderFirstFrame {
 		log.Println("Rendering first frame only...")
-		img := renderFrame(22000, 1, track, args, font, track.SmoothedPoints[0].Timestamp)
+		img := renderFrame(22000, 1, track, args, newRenderState(font, args), track.SmoothedPoints[0].Timestamp)
 		gg.SavePNG("first_frame.png", img)
 		log.Println("Saved first_frame.png")
 		return
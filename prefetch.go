@@ -2,9 +2,10 @@ package main
 
 import (
 	"bytes"
+	"container/list"
 	"fmt"
 	"image"
-	"image/color"
+	"image/draw"
 	"image/png"
 	"log"
 	"math"
@@ -42,13 +43,85 @@ var mapStyles = map[string]MapStyle{
 	"outdoor":       {Name: "outdoor", URL: "https://api.maptiler.com/maps/outdoor-v2/256/{z}/{x}/{y}.png?key=jsK0th32A1xWq2x6QeVu"},
 }
 
+// tileLRU is a mutex-guarded LRU cache for decoded tile images. A decoded
+// 2x tile is ~1 MiB of RGBA, so an unbounded cache can grow to gigabytes on
+// a long track; capping it keeps the working set of the current map view in
+// memory and falls back to the on-disk PNG cache for evicted tiles.
+type tileLRU struct {
+	mu      sync.Mutex
+	entries map[string]*list.Element
+	order   *list.List // front = most recently used
+}
+
+type tileLRUEntry struct {
+	key string
+	img image.Image
+}
+
+func newTileLRU() *tileLRU {
+	return &tileLRU{entries: make(map[string]*list.Element), order: list.New()}
+}
+
+func (c *tileLRU) Load(key string) (image.Image, bool) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	el, ok := c.entries[key]
+	if !ok {
+		return nil, false
+	}
+	c.order.MoveToFront(el)
+	return el.Value.(*tileLRUEntry).img, true
+}
+
+func (c *tileLRU) Store(key string, img image.Image) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if el, ok := c.entries[key]; ok {
+		el.Value.(*tileLRUEntry).img = img
+		c.order.MoveToFront(el)
+		return
+	}
+	c.entries[key] = c.order.PushFront(&tileLRUEntry{key: key, img: img})
+	for len(c.entries) > tileCacheMaxEntries {
+		oldest := c.order.Back()
+		c.order.Remove(oldest)
+		delete(c.entries, oldest.Value.(*tileLRUEntry).key)
+	}
+}
+
 var (
-	tileCache       sync.Map // Concurrent map for caching original tiles
+	tileCache       = newTileLRU() // Bounded cache of decoded original tiles
 	scaledTileCache = make(map[string]map[Tile]image.Image)
+
+	// Shared client with a connection pool sized for the prefetch workers,
+	// so concurrent downloads reuse TCP/TLS connections (keep-alive)
+	// instead of paying a fresh handshake per tile.
+	tileHTTPClient = &http.Client{
+		Timeout: 3 * time.Second,
+		Transport: &http.Transport{
+			MaxIdleConns:        tileFetchConcurrency * 2,
+			MaxIdleConnsPerHost: tileFetchConcurrency,
+			IdleConnTimeout:     90 * time.Second,
+		},
+	}
 )
 
 // --- Tile Downloading & Caching ---
 
+// toRGBA normalizes a decoded tile to *image.RGBA. PNG tiles decode to
+// *image.NRGBA or *image.Paletted, which forces draw.Draw onto its generic
+// per-pixel conversion path every time the tile is blitted into the mosaic;
+// converting once at cache time lets every per-frame blit take the
+// RGBA-to-RGBA row-copy fast path instead.
+func toRGBA(img image.Image) *image.RGBA {
+	if rgba, ok := img.(*image.RGBA); ok {
+		return rgba
+	}
+	rgba := image.NewRGBA(img.Bounds())
+	draw.Draw(rgba, rgba.Bounds(), img, img.Bounds().Min, draw.Src)
+	return rgba
+}
+
 func getTileImage(style string, z, x, y int, args *Arguments) (image.Image, error) {
 	styleInfo, ok := mapStyles[style]
 	if !ok {
@@ -62,7 +135,7 @@ func getTileImage(style string, z, x, y int, args *Arguments) (image.Image, erro
 	tilePath := filepath.Join(tileCacheDir, styleInfo.Name, strconv.Itoa(z), strconv.Itoa(x), tileName)
 
 	if img, ok := tileCache.Load(tilePath); ok {
-		return img.(image.Image), nil
+		return img, nil
 	}
 
 	if _, err := os.Stat(tilePath); err == nil {
@@ -81,6 +154,7 @@ func getTileImage(style string, z, x, y int, args *Arguments) (image.Image, erro
 		if args.MapBrightness != 0 || args.MapContrast != 1 {
 			img = adjustBrightnessContrast(img, args.MapBrightness, args.MapContrast)
 		}
+		img = toRGBA(img)
 		tileCache.Store(tilePath, img)
 		return img, nil
 	}
@@ -103,10 +177,7 @@ func getTileImage(style string, z, x, y int, args *Arguments) (image.Image, erro
 		req.Header.Set(k, v)
 	}
 
-	client := &http.Client{
-		Timeout: 3 * time.Second,
-	}
-	resp, err := client.Do(req)
+	resp, err := tileHTTPClient.Do(req)
 	if err != nil {
 		if os.IsTimeout(err) {
 			log.Fatalf("Tile download timed out after 3 seconds for %s: %v", url, err)
@@ -149,6 +220,7 @@ func getTileImage(style string, z, x, y int, args *Arguments) (image.Image, erro
 		img = adjustBrightnessContrast(img, args.MapBrightness, args.MapContrast)
 	}
 
+	img = toRGBA(img)
 	tileCache.Store(tilePath, img)
 	return img, nil
 }
@@ -156,28 +228,24 @@ func getTileImage(style string, z, x, y int, args *Arguments) (image.Image, erro
 func adjustBrightnessContrast(img image.Image, brightness, contrast float64) image.Image {
 	bounds := img.Bounds()
 	newImg := image.NewRGBA(bounds)
+	draw.Draw(newImg, bounds, img, bounds.Min, draw.Src)
+
+	// Brightness and contrast are per-channel functions of the input
+	// value, so bake both (plus clamping) into a 256-entry lookup table
+	// and run it over the raw pixel buffer instead of doing the float
+	// math behind At()/Set() interface calls for every pixel.
+	var lut [256]uint8
+	for i := range lut {
+		v := float64(i) + brightness*255
+		v = (v-128)*contrast + 128
+		lut[i] = uint8(math.Max(0, math.Min(255, v)))
+	}
 
-	for y := bounds.Min.Y; y < bounds.Max.Y; y++ {
-		for x := bounds.Min.X; x < bounds.Max.X; x++ {
-			r, g, b, a := img.At(x, y).RGBA()
-
-			// Adjust brightness
-			r_new := float64(r>>8) + brightness*255
-			g_new := float64(g>>8) + brightness*255
-			b_new := float64(b>>8) + brightness*255
-
-			// Adjust contrast
-			r_new = (r_new-128)*contrast + 128
-			g_new = (g_new-128)*contrast + 128
-			b_new = (b_new-128)*contrast + 128
-
-			// Clamp values
-			r_new = math.Max(0, math.Min(255, r_new))
-			g_new = math.Max(0, math.Min(255, g_new))
-			b_new = math.Max(0, math.Min(255, b_new))
-
-			newImg.Set(x, y, color.RGBA{R: uint8(r_new), G: uint8(g_new), B: uint8(b_new), A: uint8(a >> 8)})
-		}
+	pix := newImg.Pix
+	for i := 0; i < len(pix); i += 4 {
+		pix[i] = lut[pix[i]]
+		pix[i+1] = lut[pix[i+1]]
+		pix[i+2] = lut[pix[i+2]]
 	}
 	return newImg
 }
@@ -185,16 +253,17 @@ func adjustBrightnessContrast(img image.Image, brightness, contrast float64) ima
 func getAllTilesForTrack(track *Track, args *Arguments) map[Tile]struct{} {
 	tileCoords := make(map[Tile]struct{})
 
-	for _, p := range track.SmoothedPoints {
+	for i := range track.SmoothedPoints {
+		p := &track.SmoothedPoints[i]
 		widgetRadiusPx := float64(args.WidgetSize) / 2.0
 
 		adjustedMapZoom := p.TileZoom
 		residualMapScale := p.ResidualMapScale
 		effectiveWidgetRadiusPx := widgetRadiusPx * residualMapScale
 
-		worldPx, worldPy := deg2num(p.Lat, p.Lon, adjustedMapZoom)
-		worldPx *= float64(args.TileSize)
-		worldPy *= float64(args.TileSize)
+		zoomScale := math.Ldexp(1, adjustedMapZoom-args.MapZoom)
+		worldPx := (track.WorldOriginX + float64(p.WorldX)) * zoomScale * float64(args.TileSize)
+		worldPy := (track.WorldOriginY + float64(p.WorldY)) * zoomScale * float64(args.TileSize)
 
 		px_min := worldPx - effectiveWidgetRadiusPx
 		py_min := worldPy - effectiveWidgetRadiusPx
@@ -4,13 +4,17 @@ import (
 	"fmt"
 	"image"
 	"image/color"
+	"image/draw"
 	"log"
 	"math"
+	"sort"
 	"strconv"
+	"sync"
 	"time"
 
 	"github.com/fogleman/gg"
 	"github.com/golang/freetype/truetype"
+	"golang.org/x/image/font"
 )
 
 func drawSpeedIcon(dc *gg.Context, x, y, size, lineWidth float64) {
@@ -44,32 +48,114 @@ func drawSlopeIcon(dc *gg.Context, x, y, size, lineWidth float64) {
 	dc.Pop()
 }
 
-func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font *truetype.Font, segmentStartTime time.Time) image.Image {
+// renderState holds per-worker state that is expensive to rebuild on every
+// frame. truetype faces keep an internal glyph cache and are not safe for
+// concurrent use, so each render worker owns one instance instead of
+// creating fresh faces (and discarding their glyph caches) per frame.
+type renderState struct {
+	valueFace font.Face
+	unitFace  font.Face
+
+	// Reused fixed-size canvases, allocated lazily on the first frame.
+	// The image renderFrame returns is backed by frameCanvas and is only
+	// valid until the next call with the same renderState; each worker
+	// copies the pixels out before rendering its next frame.
+	frameCanvas  *image.RGBA
+	widgetCanvas *image.RGBA
+
+	// Scratch buffer for the per-frame historical path slice.
+	pathBuf []Point
+
+	// Memoized slope display point: it only changes once per 5 seconds
+	// of track time, so most frames can reuse the previous lookup.
+	slopeOffset float64
+	slopePoint  Point
+	slopeValid  bool
+}
+
+func newRenderState(f *truetype.Font, args *Arguments) *renderState {
+	valueFontSize := float64(args.WidgetSize) / 8.0
+	return &renderState{
+		valueFace: truetype.NewFace(f, &truetype.Options{Size: valueFontSize}),
+		unitFace:  truetype.NewFace(f, &truetype.Options{Size: valueFontSize / 2.0}),
+	}
+}
+
+var (
+	widgetMaskOnce sync.Once
+	widgetMask     *image.Alpha
+)
+
+// widgetClipMask returns the circular clip mask for the map widget,
+// rasterized once on first use instead of re-rasterizing the same circle on
+// every frame. AsMask copies the alpha channel of the context's image (not
+// its internal clip mask), so the circle has to be filled into the image:
+// gg's default fill pattern is opaque white, which yields the correct
+// anti-aliased alpha. The mask is read-only after creation, so sharing it
+// across render workers is safe. Note the sync.Once: there is a single
+// widget size per process (args.WidgetSize), so the size argument only
+// matters on the first call.
+func widgetClipMask(size int) *image.Alpha {
+	widgetMaskOnce.Do(func() {
+		r := float64(size) / 2.0
+		dc := gg.NewContext(size, size)
+		dc.DrawCircle(r, r, r)
+		dc.Fill()
+		widgetMask = dc.AsMask()
+	})
+	return widgetMask
+}
+
+// drawTile blits a tile into the map mosaic at an integer offset with
+// draw.Draw, which is a straight row copy. gg's DrawImage runs every pixel
+// through a bilinear transform even when the matrix is identity, which is
+// far too slow for stitching tiles every frame.
+func drawTile(dst *image.RGBA, tile image.Image, x, y int) {
+	b := tile.Bounds()
+	draw.Draw(dst, image.Rect(x, y, x+b.Dx(), y+b.Dy()), tile, b.Min, draw.Src)
+}
+
+func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, rs *renderState, segmentStartTime time.Time) image.Image {
 	timeOffset := float64(frameNum) / args.Framerate
 	currentPoint := findPointForTime(timeOffset, segmentStartTime, track.SmoothedPoints)
 	fiveSecondIntervalStartOffset := math.Floor(timeOffset/5.0) * 5.0
-	slopeDisplayPoint := findPointForTime(fiveSecondIntervalStartOffset, segmentStartTime, track.SmoothedPoints)
+	if !rs.slopeValid || rs.slopeOffset != fiveSecondIntervalStartOffset {
+		rs.slopePoint = findPointForTime(fiveSecondIntervalStartOffset, segmentStartTime, track.SmoothedPoints)
+		rs.slopeOffset = fiveSecondIntervalStartOffset
+		rs.slopeValid = true
+	}
+	slopeDisplayPoint := rs.slopePoint
 
 	// --- Calculations ---
-	pathSoFar := []Point{}
 	// Calculate the timestamp after which the path should be drawn
 	skipUntilTimestamp := track.SmoothedPoints[0].Timestamp.Add(time.Duration(args.SkipPathSeconds * float64(time.Second)))
 
-	for i := 0; i < len(track.Points) && track.Points[i].Timestamp.Before(currentPoint.Timestamp); i++ {
-		// Only add points to pathSoFar if their timestamp is after the skipUntilTimestamp
-		if track.Points[i].Timestamp.After(skipUntilTimestamp) {
-			pathSoFar = append(pathSoFar, track.Points[i])
-		}
+	// Points are sorted by timestamp, so the historical path is the
+	// contiguous range (skipUntil, currentPoint) — locate it with two
+	// binary searches instead of scanning and appending point by point
+	// on every frame, and copy it into a buffer reused across frames.
+	pathStart := sort.Search(len(track.Points), func(i int) bool {
+		return track.Points[i].Timestamp.After(skipUntilTimestamp)
+	})
+	pathEnd := sort.Search(len(track.Points), func(i int) bool {
+		return !track.Points[i].Timestamp.Before(currentPoint.Timestamp)
+	})
+	if pathStart > pathEnd {
+		pathStart = pathEnd
 	}
+	pathSoFar := append(rs.pathBuf[:0], track.Points[pathStart:pathEnd]...)
 	// Always add the current point, regardless of skip time, as it represents the current position
 	pathSoFar = append(pathSoFar, currentPoint)
+	rs.pathBuf = pathSoFar
 
 	if currentPoint.MapScale > 16 {
-		sparsePathSoFar := make([]Point, 0, len(pathSoFar))
+		// compact every 15th point in place; i >= n so nothing is overwritten early
+		n := 0
 		for i := 0; i < len(pathSoFar); i += 15 {
-			sparsePathSoFar = append(sparsePathSoFar, pathSoFar[i])
+			pathSoFar[n] = pathSoFar[i]
+			n++
 		}
-		pathSoFar = sparsePathSoFar
+		pathSoFar = pathSoFar[:n]
 	}
 
 	speed := currentPoint.Speed
@@ -96,9 +182,17 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 	var mapDC *gg.Context
 	var centerPxOnMap, centerPyOnMap float64
 
-	worldPx, worldPy := deg2num(currentPoint.Lat, currentPoint.Lon, adjustedMapZoom)
-	worldPx *= float64(args.TileSize)
-	worldPy *= float64(args.TileSize)
+	// Tile coordinates are precomputed at args.MapZoom; rescale to the
+	// zoom actually used for this frame.
+	zoomScale := math.Ldexp(1, adjustedMapZoom-args.MapZoom)
+
+	// WorldX/WorldY are float32 offsets from the track origin;
+	// reconstruct absolute tile coordinates in float64.
+	originX := track.WorldOriginX * zoomScale
+	originY := track.WorldOriginY * zoomScale
+
+	worldPx := (originX + float64(currentPoint.WorldX)*zoomScale) * float64(args.TileSize)
+	worldPy := (originY + float64(currentPoint.WorldY)*zoomScale) * float64(args.TileSize)
 
 	if targetCachedResidualScale > 0 {
 		// --- Cached Render Path ---
@@ -125,7 +219,7 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 			for y := int(ty_min); y <= int(ty_max); y++ {
 				tile := Tile{X: x, Y: y, Z: adjustedMapZoom}
 				if scaledImg, ok := scaledTileCache[scaleKey][tile]; ok {
-					mapDC.DrawImage(scaledImg, (x-int(tx_min))*scaledTileSize, (y-int(ty_min))*scaledTileSize)
+					drawTile(mapImage, scaledImg, (x-int(tx_min))*scaledTileSize, (y-int(ty_min))*scaledTileSize)
 				}
 			}
 		}
@@ -138,12 +232,23 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 			mapDC.SetColor(args.PathColor)
 			mapDC.SetLineWidth(args.PathWidth)
 
+			// Segments fully outside the map image cost as much to
+			// rasterize as visible ones, so cull them (with a
+			// stroke-width margin) and batch the rest into one stroke
+			// instead of a rasterizer pass per segment.
+			margin := args.PathWidth
+			minX, minY := -margin, -margin
+			maxX, maxY := float64(mapWidth)+margin, float64(mapHeight)+margin
+
+			penDown := false
 			prevX := math.NaN()
 			prevY := math.NaN()
 
 			for i := 1; i < len(pathSoFar); i++ {
-				p1x, p1y := deg2num(pathSoFar[i-1].Lat, pathSoFar[i-1].Lon, adjustedMapZoom)
-				p2x, p2y := deg2num(pathSoFar[i].Lat, pathSoFar[i].Lon, adjustedMapZoom)
+				p1x := originX + float64(pathSoFar[i-1].WorldX)*zoomScale
+				p1y := originY + float64(pathSoFar[i-1].WorldY)*zoomScale
+				p2x := originX + float64(pathSoFar[i].WorldX)*zoomScale
+				p2y := originY + float64(pathSoFar[i].WorldY)*zoomScale
 				sp1x := (p1x*float64(args.TileSize) - tx_min*float64(args.TileSize)) * scalingFactor
 				sp1y := (p1y*float64(args.TileSize) - ty_min*float64(args.TileSize)) * scalingFactor
 				sp2x := (p2x*float64(args.TileSize) - tx_min*float64(args.TileSize)) * scalingFactor
@@ -162,9 +267,21 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 					prevY = sp1y
 					continue
 				}
-				mapDC.DrawLine(sp1x, sp1y, sp2x, sp2y)
-				mapDC.Stroke()
+				// reject only when both endpoints are beyond the same
+				// edge; a long chord (e.g. a recording gap) can cross
+				// the view with both endpoints outside
+				if (sp1x < minX && sp2x < minX) || (sp1x > maxX && sp2x > maxX) ||
+					(sp1y < minY && sp2y < minY) || (sp1y > maxY && sp2y > maxY) {
+					penDown = false
+					continue
+				}
+				if !penDown {
+					mapDC.MoveTo(sp1x, sp1y)
+					penDown = true
+				}
+				mapDC.LineTo(sp2x, sp2y)
 			}
+			mapDC.Stroke()
 		}
 	} else {
 		// --- Dynamic Scale Render Path ---
@@ -192,7 +309,7 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 					log.Printf("could not get tile image: %v", err)
 				}
 				if tileImg != nil {
-					mapDC.DrawImage(tileImg, (x-int(tx_min))*args.TileSize, (y-int(ty_min))*args.TileSize)
+					drawTile(mapImage, tileImg, (x-int(tx_min))*args.TileSize, (y-int(ty_min))*args.TileSize)
 				}
 			}
 		}
@@ -204,12 +321,36 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 		if len(pathSoFar) > 1 {
 			mapDC.SetColor(args.PathColor)
 			mapDC.SetLineWidth(args.PathWidth)
+
+			// Same cull-and-batch as the cached path above.
+			margin := args.PathWidth
+			minX, minY := -margin, -margin
+			maxX, maxY := float64(mapWidth)+margin, float64(mapHeight)+margin
+
+			penDown := false
 			for i := 1; i < len(pathSoFar); i++ {
-				p1x, p1y := deg2num(pathSoFar[i-1].Lat, pathSoFar[i-1].Lon, adjustedMapZoom)
-				p2x, p2y := deg2num(pathSoFar[i].Lat, pathSoFar[i].Lon, adjustedMapZoom)
-				mapDC.DrawLine((p1x-tx_min)*float64(args.TileSize), (p1y-ty_min)*float64(args.TileSize), (p2x-tx_min)*float64(args.TileSize), (p2y-ty_min)*float64(args.TileSize))
-				mapDC.Stroke()
+				p1x := originX + float64(pathSoFar[i-1].WorldX)*zoomScale
+				p1y := originY + float64(pathSoFar[i-1].WorldY)*zoomScale
+				p2x := originX + float64(pathSoFar[i].WorldX)*zoomScale
+				p2y := originY + float64(pathSoFar[i].WorldY)*zoomScale
+				sp1x := (p1x - tx_min) * float64(args.TileSize)
+				sp1y := (p1y - ty_min) * float64(args.TileSize)
+				sp2x := (p2x - tx_min) * float64(args.TileSize)
+				sp2y := (p2y - ty_min) * float64(args.TileSize)
+
+				// same same-edge rejection as the cached path above
+				if (sp1x < minX && sp2x < minX) || (sp1x > maxX && sp2x > maxX) ||
+					(sp1y < minY && sp2y < minY) || (sp1y > maxY && sp2y > maxY) {
+					penDown = false
+					continue
+				}
+				if !penDown {
+					mapDC.MoveTo(sp1x, sp1y)
+					penDown = true
+				}
+				mapDC.LineTo(sp2x, sp2y)
 			}
+			mapDC.Stroke()
 		}
 	}
 
@@ -223,9 +364,13 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 	mapDC.Stroke()
 
 	// Crop circular widget
-	mask := gg.NewContext(args.WidgetSize, args.WidgetSize)
-	mask.DrawCircle(widgetRadiusPx, widgetRadiusPx, widgetRadiusPx)
-	mask.Clip()
+	if rs.widgetCanvas == nil {
+		rs.widgetCanvas = image.NewRGBA(image.Rect(0, 0, args.WidgetSize, args.WidgetSize))
+	} else {
+		clear(rs.widgetCanvas.Pix) // zero RGBA == transparent black
+	}
+	mask := gg.NewContextForRGBA(rs.widgetCanvas)
+	mask.SetMask(widgetClipMask(args.WidgetSize))
 
 	if targetCachedResidualScale <= 0 && currentPoint.MapScale != 1.0 {
 		// Apply dynamic scaling only if not using a cached version
@@ -239,7 +384,12 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 	mask.DrawImage(mapDC.Image(), -int(centerPxOnMap-widgetRadiusPx), -int(centerPyOnMap-widgetRadiusPx))
 
 	// --- Final Frame Composition ---
-	frameDC := gg.NewContext(args.VideoWidth, args.VideoHeight)
+	if rs.frameCanvas == nil {
+		rs.frameCanvas = image.NewRGBA(image.Rect(0, 0, args.VideoWidth, args.VideoHeight))
+	} else {
+		clear(rs.frameCanvas.Pix)
+	}
+	frameDC := gg.NewContextForRGBA(rs.frameCanvas)
 	mapPosX := float64(20)
 	mapPosY := float64(20)
 	frameDC.DrawImage(mask.Image(), int(mapPosX), int(mapPosY))
@@ -277,12 +427,22 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 
 
 	if len(pathSoFar) > 1 {
-		current_world_px, current_world_py := deg2num(currentPoint.Lat, currentPoint.Lon, adjustedMapZoom)
+		// only coordinate differences are used here, so the track origin cancels out
+		current_world_px := float64(currentPoint.WorldX) * zoomScale
+		current_world_py := float64(currentPoint.WorldY) * zoomScale
 		frameDC.SetColor(args.PathColor)
 		frameDC.SetLineWidth(args.PathWidth)
+
+		// Everything outside the clipped widget circle is invisible, so
+		// cull those segments and stroke the visible polyline in one go.
+		cullRadius := widgetRadiusPx + args.PathWidth
+		penDown := false
+
 		for i := 1; i < len(pathSoFar); i++ {
-			p1_world_px, p1_world_py := deg2num(pathSoFar[i-1].Lat, pathSoFar[i-1].Lon, adjustedMapZoom)
-			p2_world_px, p2_world_py := deg2num(pathSoFar[i].Lat, pathSoFar[i].Lon, adjustedMapZoom)
+			p1_world_px := float64(pathSoFar[i-1].WorldX) * zoomScale
+			p1_world_py := float64(pathSoFar[i-1].WorldY) * zoomScale
+			p2_world_px := float64(pathSoFar[i].WorldX) * zoomScale
+			p2_world_py := float64(pathSoFar[i].WorldY) * zoomScale
 
 			dx1 := (p1_world_px - current_world_px) * float64(args.TileSize)
 			dy1 := (p1_world_py - current_world_py) * float64(args.TileSize)
@@ -294,9 +454,21 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 			screen_dx2 := dx2 / residualMapScale
 			screen_dy2 := dy2 / residualMapScale
 
-			frameDC.DrawLine(widgetCenterX+screen_dx1, widgetCenterY+screen_dy1, widgetCenterX+screen_dx2, widgetCenterY+screen_dy2)
-			frameDC.Stroke()
+			// reject only segments fully beyond one side of the
+			// ±cullRadius box; a chord crossing the widget has its
+			// endpoints on opposite sides and must still be drawn
+			if (screen_dx1 < -cullRadius && screen_dx2 < -cullRadius) || (screen_dx1 > cullRadius && screen_dx2 > cullRadius) ||
+				(screen_dy1 < -cullRadius && screen_dy2 < -cullRadius) || (screen_dy1 > cullRadius && screen_dy2 > cullRadius) {
+				penDown = false
+				continue
+			}
+			if !penDown {
+				frameDC.MoveTo(widgetCenterX+screen_dx1, widgetCenterY+screen_dy1)
+				penDown = true
+			}
+			frameDC.LineTo(widgetCenterX+screen_dx2, widgetCenterY+screen_dy2)
 		}
+		frameDC.Stroke()
 	}
 	frameDC.Pop() // Reset clip
 	frameDC.ResetClip()
@@ -334,8 +506,8 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 	iconSize := widgetWidth / 9.0
 	iconLineWidth := widgetWidth / 150.0
 
-	valueFace := truetype.NewFace(font, &truetype.Options{Size: valueFontSize})
-	unitFace := truetype.NewFace(font, &truetype.Options{Size: unitFontSize})
+	valueFace := rs.valueFace
+	unitFace := rs.unitFace
 
 	row1Y := mapPosY + widgetWidth + valueFontSize*1.2
 
@@ -398,40 +570,50 @@ func renderFrame(frameNum, totalFrames int, track *Track, args *Arguments, font
 
 func findPointForTime(offset float64, startTime time.Time, points []Point) Point {
 	targetTime := startTime.Add(time.Duration(offset * float64(time.Second)))
-	for i := 0; i < len(points)-1; i++ {
-		p1, p2 := points[i], points[i+1]
-		if (p1.Timestamp.Equal(targetTime) || p1.Timestamp.Before(targetTime)) && (p2.Timestamp.Equal(targetTime) || p2.Timestamp.After(targetTime)) {
-			timeDiff := p2.Timestamp.Sub(p1.Timestamp).Seconds()
-			if timeDiff == 0 {
-				return p1
-			}
-			ratio := targetTime.Sub(p1.Timestamp).Seconds() / timeDiff
-			derivedCalcRatio := ratio
-			if timeDiff < 2.0 { // между точками малый интервал
-				derivedCalcRatio = 0
-			}
-			p2ResidualMapScale := p2.ResidualMapScale
-			if p1.TileZoom != p2.TileZoom {
-				p2ResidualMapScale = p2.ResidualMapScale * math.Pow(2, float64(p1.TileZoom-p2.TileZoom))
-			}
-			return Point{
-				Lat:              p1.Lat + (p2.Lat-p1.Lat)*ratio,
-				Lon:              p1.Lon + (p2.Lon-p1.Lon)*ratio,
-				Ele:              p1.Ele + (p2.Ele-p1.Ele)*ratio,
-				Speed:            p1.Speed + (p2.Speed-p1.Speed)*derivedCalcRatio,
-				AvgSpeed:         p1.AvgSpeed + (p2.AvgSpeed-p1.AvgSpeed)*derivedCalcRatio,
-				Slope:            p1.Slope + (p2.Slope-p1.Slope)*derivedCalcRatio,
-				SmoothedSlope:    p1.SmoothedSlope + (p2.SmoothedSlope-p1.SmoothedSlope)*derivedCalcRatio,
-				Distance:         p1.Distance + (p2.Distance-p1.Distance)*derivedCalcRatio,
-				MapScale:         p1.MapScale + (p2.MapScale-p1.MapScale)*ratio,
-				Timestamp:        targetTime,
-				TileZoom:         p1.TileZoom,
-				ResidualMapScale: p1.ResidualMapScale + (p2ResidualMapScale-p1.ResidualMapScale)*ratio,
-				Bearing:          interpolateBearing(p1.Bearing, p2.Bearing, ratio),
-			}
-		}
+	// points are sorted by timestamp, so binary search for the first point
+	// past targetTime instead of scanning the whole track on every frame
+	i := sort.Search(len(points), func(i int) bool {
+		return points[i].Timestamp.After(targetTime)
+	})
+	if i >= len(points) {
+		return points[len(points)-1]
+	}
+	if i == 0 {
+		return points[0]
+	}
+	p1, p2 := points[i-1], points[i]
+	timeDiff := p2.Timestamp.Sub(p1.Timestamp).Seconds()
+	if timeDiff == 0 {
+		return p1
+	}
+	ratio := targetTime.Sub(p1.Timestamp).Seconds() / timeDiff
+	derivedCalcRatio := ratio
+	if timeDiff < 2.0 { // между точками малый интервал
+		derivedCalcRatio = 0
+	}
+	p2ResidualMapScale := p2.ResidualMapScale
+	if p1.TileZoom != p2.TileZoom {
+		p2ResidualMapScale = math.Ldexp(p2.ResidualMapScale, p1.TileZoom-p2.TileZoom)
+	}
+	return Point{
+		Lat: p1.Lat + (p2.Lat-p1.Lat)*ratio,
+		Lon: p1.Lon + (p2.Lon-p1.Lon)*ratio,
+		Ele: p1.Ele + (p2.Ele-p1.Ele)*ratio,
+		// linear interpolation of mercator coords is sub-pixel accurate
+		// for points a few metres apart
+		WorldX:           p1.WorldX + (p2.WorldX-p1.WorldX)*float32(ratio),
+		WorldY:           p1.WorldY + (p2.WorldY-p1.WorldY)*float32(ratio),
+		Speed:            p1.Speed + (p2.Speed-p1.Speed)*derivedCalcRatio,
+		AvgSpeed:         p1.AvgSpeed + (p2.AvgSpeed-p1.AvgSpeed)*derivedCalcRatio,
+		Slope:            p1.Slope + (p2.Slope-p1.Slope)*derivedCalcRatio,
+		SmoothedSlope:    p1.SmoothedSlope + (p2.SmoothedSlope-p1.SmoothedSlope)*derivedCalcRatio,
+		Distance:         p1.Distance + (p2.Distance-p1.Distance)*derivedCalcRatio,
+		MapScale:         p1.MapScale + (p2.MapScale-p1.MapScale)*ratio,
+		Timestamp:        targetTime,
+		TileZoom:         p1.TileZoom,
+		ResidualMapScale: p1.ResidualMapScale + (p2ResidualMapScale-p1.ResidualMapScale)*ratio,
+		Bearing:          interpolateBearing(p1.Bearing, p2.Bearing, ratio),
 	}
-	return points[len(points)-1]
 }
 
 func interpolateBearing(b1, b2, ratio float64) float64 {
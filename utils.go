@@ -101,7 +101,7 @@ func parseHexColor(s string) (color.Color, error) {
 
 func deg2num(lat, lon float64, zoom int) (float64, float64) {
 	latRad := lat * math.Pi / 180
-	n := math.Pow(2, float64(zoom))
+	n := math.Ldexp(1, zoom) // 2^zoom as a plain exponent load, not Pow
 	xtile := (lon + 180) / 360 * n
 	ytile := (1 - math.Asinh(math.Tan(latRad))/math.Pi) / 2 * n
 	return xtile, ytile
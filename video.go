@@ -1,9 +1,8 @@
 package main
 
 import (
-	"bytes"
 	"fmt"
-	"image/png"
+	"image"
 	"log"
 	"os"
 	"os/exec"
@@ -21,6 +20,22 @@ type Frame struct {
 	Data   []byte
 }
 
+// framePool recycles raw RGBA frame buffers between the render workers and
+// the encoder goroutine. Every frame is the same size, so without pooling
+// the pipeline churns through frame-size allocations at the full framerate.
+var framePool sync.Pool
+
+func getFrameBuffer(size int) []byte {
+	if buf, ok := framePool.Get().(*[]byte); ok && cap(*buf) >= size {
+		return (*buf)[:size]
+	}
+	return make([]byte, size)
+}
+
+func putFrameBuffer(buf []byte) {
+	framePool.Put(&buf)
+}
+
 // --- Video Pipeline ---
 
 func generateFrames(frameChan chan<- Frame, track *Track, args *Arguments, totalFrames int, font *truetype.Font, segmentStartTime time.Time) {
@@ -38,20 +53,21 @@ func generateFrames(frameChan chan<- Frame, track *Track, args *Arguments, total
 		wg.Add(1)
 		go func() {
 			defer wg.Done()
-			pngBuffer := new(bytes.Buffer)
-
+			rs := newRenderState(font, args)
 			for frameNum := range tasks {
-				img := renderFrame(frameNum, totalFrames, track, args, font, segmentStartTime)
+				img := renderFrame(frameNum, totalFrames, track, args, rs, segmentStartTime)
 
-				pngBuffer.Reset()
-				err := png.Encode(pngBuffer, img)
-				if err != nil {
-					log.Printf("Failed to encode frame %d: %v", frameNum, err)
+				// gg contexts are backed by *image.RGBA with a zero-origin
+				// bounds, so Pix is exactly width*height*4 bytes — pipe it
+				// to ffmpeg as-is, no PNG encode/decode round trip.
+				rgba, ok := img.(*image.RGBA)
+				if !ok {
+					log.Printf("Failed to pass frame %d to ffmpeg: unexpected image type %T", frameNum, img)
 					continue
 				}
 
-				frameData := make([]byte, pngBuffer.Len())
-				copy(frameData, pngBuffer.Bytes())
+				frameData := getFrameBuffer(len(rgba.Pix))
+				copy(frameData, rgba.Pix)
 
 				frameChan <- Frame{Number: frameNum, Data: frameData}
 			}
@@ -62,7 +78,7 @@ func generateFrames(frameChan chan<- Frame, track *Track, args *Arguments, total
 
 func runVideoPipeline(track *Track, args *Arguments, font *truetype.Font) {
 	// --- FFMPEG Setup ---
-	ffmpegCmd := exec.Command("ffmpeg", "-y", "-f", "image2pipe", "-vcodec", "png", "-r", fmt.Sprintf("%f", args.Framerate), "-i", "-", "-c:v", "libx264", "-b:v", args.Bitrate, "-pix_fmt", "yuva420p", "-r", fmt.Sprintf("%f", args.Framerate), args.OutputFile)
+	ffmpegCmd := exec.Command("ffmpeg", "-y", "-f", "rawvideo", "-vcodec", "rawvideo", "-pix_fmt", "rgba", "-s", fmt.Sprintf("%dx%d", args.VideoWidth, args.VideoHeight), "-r", fmt.Sprintf("%f", args.Framerate), "-i", "-", "-c:v", "libx264", "-b:v", args.Bitrate, "-pix_fmt", "yuva420p", "-r", fmt.Sprintf("%f", args.Framerate), args.OutputFile)
 	ffmpegIn, err := ffmpegCmd.StdinPipe()
 	if err != nil {
 		log.Fatalf("Failed to get ffmpeg stdin pipe: %v", err)
@@ -123,6 +139,7 @@ func runVideoPipeline(track *Track, args *Arguments, font *truetype.Font) {
 					bar.Add(1)
 
 					delete(frameBuffer, nextFrameToWrite)
+					putFrameBuffer(data)
 					nextFrameToWrite++
 				}
 